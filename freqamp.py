@@ -1,7 +1,9 @@
 import argparse
+import sys
 import sounddevice as sd
 import numpy as np
 import scipy.signal as signal  # For filtering
+from numba import njit  # For the real-time filter kernel
 
 def int_or_str(text):
     """Helper function for argument parsing."""
@@ -28,13 +30,17 @@ parser = argparse.ArgumentParser(
 )
 parser.add_argument('-i', '--input-device', type=int_or_str, help='Input device (numeric ID or substring)')
 parser.add_argument('-o', '--output-device', type=int_or_str, help='Output device (numeric ID or substring)')
-parser.add_argument('--dtype', help='Audio data type')
 parser.add_argument('--samplerate', type=float, default=44100, help='Sampling rate (default: 44100 Hz)')
 parser.add_argument('--blocksize', type=int, help='Block size')
 parser.add_argument('--latency', type=float, help='Latency in seconds')
+parser.add_argument('-c', '--channels', type=int, help='Number of channels (default: all input channels of the device)')
 
 args = parser.parse_args(remaining)
 
+# The stream opens the devices given on the command line (None selects the system defaults);
+# the fallbacks below only pick the device whose info is shown and whose channel count is the default
+stream_device = (args.input_device, args.output_device)
+
 # Set defaults based on your available devices
 if args.input_device is None:
     args.input_device = 1  # Default Microphone
@@ -46,9 +52,9 @@ if args.output_device is None:
 input_device_info = sd.query_devices(args.input_device)
 max_input_channels = input_device_info['max_input_channels']
 
-# Ensure the number of channels doesn't exceed the device limit
-parser.add_argument('-c', '--channels', type=int, default=max_input_channels, help='Number of channels')
-args = parser.parse_args(remaining)  # Re-parse to update args.channels
+# Default to every channel the input device offers
+if args.channels is None:
+    args.channels = max_input_channels
 
 print(f"Using input device {args.input_device}: {input_device_info['name']} (Supports {max_input_channels} channels)")
 print(f"Using output device {args.output_device}")
@@ -67,41 +73,82 @@ def high_frequency_boost_filter(fs, gain=GAIN_HIGH_FREQUENCY, cutoff=CUTOFF_FREQ
     """Designs a high-pass filter to boost high frequencies."""
     nyquist = 0.5 * fs  # Nyquist frequency
     normalized_cutoff = cutoff / nyquist  # Normalize cutoff frequency
-    b, a = signal.butter(2, normalized_cutoff, btype='high', analog=False)
-    
-    # Apply gain to high frequencies
-    b *= gain  
-    return b, a
+    sos = signal.butter(2, normalized_cutoff, btype='high', analog=False, output='sos')
 
-# Precompute filter coefficients
-b, a = high_frequency_boost_filter(args.samplerate)
+    # Normalize each section by a0 once, so the kernels never divide
+    sos /= sos[:, 3:4]
+    
+    # Apply gain to high frequencies (scaling the last section scales the cascade)
+    sos[-1, :3] *= gain
+
+    # Match the float32 audio so filtering never upcasts to float64
+    return sos.astype(np.float32)
+
+@njit(cache=True, fastmath=True)
+def biquad_multi(x, coeffs, z, out):
+    """Runs a Direct-Form-II-Transposed biquad over all channels, updating state `z` in place.
+
+    `coeffs` holds (b0, b1, b2, a1, a2) and `z` holds the (z1, z2) rows, one column per channel.
+    Channels are the inner loop so each time step vectorizes across them.
+    Output is clipped to [-1, 1] with a branchless select and written straight into `out`.
+    """
+    b0, b1, b2, a1, a2 = coeffs[0], coeffs[1], coeffs[2], coeffs[3], coeffs[4]
+    lo, hi = np.float32(-1.0), np.float32(1.0)  # clip bounds, float32 so the select stays float32
+    z1 = z[0]
+    z2 = z[1]
+    for n in range(x.shape[0]):
+        for ch in range(x.shape[1]):
+            xn = x[n, ch]
+            y = b0 * xn + z1[ch]
+            z1[ch] = b1 * xn - a1 * y + z2[ch]
+            z2[ch] = b2 * xn - a2 * y
+            out[n, ch] = lo if y < lo else (hi if y > hi else y)
+
+# Precompute filter coefficients (a single second-order section) as (b0, b1, b2, a1, a2)
+sos = high_frequency_boost_filter(args.samplerate)
+coeffs = sos[0, [0, 1, 2, 4, 5]]
+
+# Filter state (z1, z2 rows, one column per channel) carried across callbacks, seeded from the first block
+z = np.zeros((2, args.channels), dtype=np.float32)
+z_seeded = False
+
+# Steady-state state for a unit step, solved here rather than on the audio thread
+zi_unit = signal.sosfilt_zi(sos)[0][:, None].astype(np.float32)
+
+# Compile the kernel now rather than on the first audio block (seeding overwrites z)
+_warmup = np.zeros((1, args.channels), dtype=np.float32)
+biquad_multi(_warmup, coeffs, z, _warmup)
+
+# Stream status flags accumulated by the callback, reported after streaming
+callback_status = sd.CallbackFlags()
 
 # ===========================
 # Audio Processing Callback
 # ===========================
 def callback(indata, outdata, frames, time, status):
-    if status:
-        print(status)
-    
-    # Convert input to float for processing
-    processed_audio = indata.copy()
-    
-    # Apply high-frequency amplification
-    processed_audio = signal.lfilter(b, a, processed_audio, axis=0)
+    global z_seeded, callback_status
+    callback_status |= status
+
+    # View the raw float32 buffers as (frames, channels) without copying
+    indata = np.frombuffer(indata, dtype=np.float32).reshape(frames, args.channels)
+    outdata = np.frombuffer(outdata, dtype=np.float32).reshape(frames, args.channels)
 
-    # Clip values to avoid distortion
-    processed_audio = np.clip(processed_audio, -1.0, 1.0)
+    if not z_seeded:
+        # Steady-state initial conditions avoid a start-up transient
+        np.multiply(zi_unit, indata[0], out=z)
+        z_seeded = True
     
-    outdata[:] = processed_audio
+    # Apply high-frequency amplification and clipping, continuing from the previous block
+    biquad_multi(indata, coeffs, z, outdata)
 
 # ===========================
 # Audio Streaming
 # ===========================
 try:
-    with sd.Stream(device=(args.input_device, args.output_device),
-                   samplerate=args.samplerate, blocksize=args.blocksize,
-                   dtype=args.dtype, latency=args.latency,
-                   channels=args.channels, callback=callback):
+    with sd.RawStream(device=stream_device,
+                      samplerate=args.samplerate, blocksize=args.blocksize,
+                      dtype='float32', latency=args.latency,
+                      channels=args.channels, callback=callback):
         print('#' * 80)
         print('Press Return to quit')
         print('#' * 80)
@@ -110,3 +157,7 @@ except KeyboardInterrupt:
     parser.exit('')
 except Exception as e:
     parser.exit(type(e).__name__ + ': ' + str(e))
+finally:
+    # Report stream status on every exit path, including Ctrl+C and errors
+    if callback_status:
+        print(callback_status, file=sys.stderr)
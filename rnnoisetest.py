@@ -1,4 +1,5 @@
 import argparse
+import queue
 import sounddevice as sd
 import numpy as np
 from pyrnnoise import RNNoise  # Import pyrnnoise for noise suppression
@@ -27,43 +28,59 @@ parser = argparse.ArgumentParser(
 parser.add_argument('-i', '--input-device', type=int_or_str, help='Input device (numeric ID or substring)')
 parser.add_argument('-o', '--output-device', type=int_or_str, help='Output device (numeric ID or substring)')
 parser.add_argument('-c', '--channels', type=int, default=1, help='Number of channels (1 for mono, 2 for stereo)')
-parser.add_argument('--dtype', help='Audio data type', default='float32')
+parser.add_argument('--dtype', help='Audio data type (default: float32, as used by RNNoise)', default='float32')
 parser.add_argument('--samplerate', type=float, help='Sampling rate', default=48000)  # Default to 48kHz
-parser.add_argument('--blocksize', type=int, help='Block size')
+parser.add_argument('--blocksize', type=int, help='Block size (default: one 10 ms RNNoise frame, 480 at 48 kHz)')
 parser.add_argument('--latency', type=float, help='Latency in seconds')
 args = parser.parse_args(remaining)
 
-# Initialize RNNoise denoiser
-denoiser = RNNoise(sample_rate=int(args.samplerate))
+# RNNoise works on 10 ms frames; matching the block size avoids internal re-chunking
+rnnoise_frame_size = int(args.samplerate) // 100
+if args.blocksize is None:
+    args.blocksize = rnnoise_frame_size
+elif args.blocksize <= 0 or args.blocksize % rnnoise_frame_size:
+    # The callbacks write each RNNoise return straight into outdata, so every block
+    # must be a fixed whole number of frames (this also rules out PortAudio's variable size 0)
+    parser.error(f"--blocksize must be a positive multiple of the RNNoise frame size "
+                 f"({rnnoise_frame_size} at {int(args.samplerate)} Hz)")
 
-# Define the audio callback function
-def callback(indata, outdata, frames, time, status):
-    """Processes live audio input, applies noise suppression, and plays back the denoised sound."""
-    if status:
-        print("⚠️ Stream Status:", status)
+# Initialize one RNNoise denoiser per channel so each keeps its own state
+denoisers = [RNNoise(sample_rate=int(args.samplerate)) for _ in range(args.channels)]
+
+# Prime each denoiser with a block of silence so its native state is allocated
+# here rather than on the audio thread
+for denoiser in denoisers:
+    denoiser.process_frame(np.zeros(args.blocksize, dtype=np.float32), last=False)
+
+# Channel-row buffer reused across callbacks (every block is exactly `blocksize` frames)
+channel_buf = np.empty((args.channels, args.blocksize), dtype=np.float32)
 
-    print(f"🎙️ Capturing {frames} frames of audio... Shape: {indata.shape}")
+# Stream status reported by the callback, printed from the main thread
+status_queue = queue.SimpleQueue()
 
-    # Ensure `indata` is always 2D (stereo format)
-    is_mono = False
-    if indata.ndim == 1:  # If it's mono (1D), reshape it to 2D
-        indata = indata.reshape(-1, 1)  # Convert mono (1D) to stereo-like (2D)
-        is_mono = True
+# Audio callbacks, specialized for the channel count fixed at stream-open time
+def callback_mono(indata, outdata, frames, time, status):
+    """Processes live mono input, applies noise suppression, and plays back the denoised sound."""
+    if status:
+        status_queue.put(status)
+
+    # A single column is already contiguous, so it goes to RNNoise as-is
+    outdata[:, 0] = denoisers[0].process_frame(indata[:, 0].astype(np.float32, copy=False), last=False)
 
-    # Normalize input audio to the range expected by RNNoise
-    indata = indata.astype(np.float32)
+def callback_multi(indata, outdata, frames, time, status):
+    """Processes live multi-channel input, applies noise suppression, and plays back the denoised sound."""
+    if status:
+        status_queue.put(status)
 
-    # Apply denoising
-    denoised_audio = np.zeros_like(indata)
-    for ch in range(indata.shape[1]):  # Iterate over channels
-        denoised_audio[:, ch] = denoiser.process_frame(indata[:, ch], last=False)
+    # Lay channels out as contiguous rows so RNNoise gets C-contiguous input
+    # (copyto also converts to the float32 RNNoise expects)
+    np.copyto(channel_buf, indata.T)
 
-    # If the original input was mono, reshape it back to 1D
-    if is_mono:
-        denoised_audio = denoised_audio.flatten()
+    # Apply denoising, writing each channel straight into the output
+    for ch, denoiser in enumerate(denoisers):  # Iterate over channels
+        outdata[:, ch] = denoiser.process_frame(channel_buf[ch], last=False)
 
-    # Ensure the output shape matches input shape
-    outdata[:] = denoised_audio.reshape(outdata.shape)
+callback = callback_mono if args.channels == 1 else callback_multi
 
 # Set up and start the real-time audio stream
 try:
@@ -80,3 +97,7 @@ except KeyboardInterrupt:
     parser.exit('')
 except Exception as e:
     parser.exit(type(e).__name__ + ': ' + str(e))
+finally:
+    # Report stream status on every exit path, including Ctrl+C and errors
+    while not status_queue.empty():
+        print("⚠️ Stream Status:", status_queue.get())
@@ -1,8 +1,10 @@
 import argparse
+import os
 import tempfile
 import queue
 import sys
-import sounddevice as sd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import soundfile as sf
 import numpy as np
 from pyrnnoise import RNNoise  # Import RNNoise for noise reduction
@@ -14,89 +16,136 @@ def int_or_str(text):
     except ValueError:
         return text
 
-# Argument parser setup
-parser = argparse.ArgumentParser(add_help=False)
-parser.add_argument(
-    '-l', '--list-devices', action='store_true',
-    help='Show list of audio devices and exit'
-)
-args, remaining = parser.parse_known_args()
-if args.list_devices:
-    print(sd.query_devices())
-    parser.exit(0)
-
-parser = argparse.ArgumentParser(
-    description="Record audio and apply noise reduction using pyrnnoise",
-    formatter_class=argparse.RawDescriptionHelpFormatter,
-    parents=[parser]
-)
-parser.add_argument('filename', nargs='?', metavar='FILENAME', help='Audio file to store recording')
-parser.add_argument('-d', '--device', type=int_or_str, help='Input device (numeric ID or substring)')
-parser.add_argument('-r', '--samplerate', type=int, help='Sampling rate')
-parser.add_argument('-c', '--channels', type=int, default=1, help='Number of input channels')
-parser.add_argument('-t', '--subtype', type=str, help='Sound file subtype (e.g. "PCM_24")')
-args = parser.parse_args(remaining)
-
-q = queue.Queue()
-
-# Callback function for real-time audio streaming
-def callback(indata, frames, time, status):
-    if status:
-        print(status, file=sys.stderr)
-    q.put(indata.copy())
-
-try:
-    if args.samplerate is None:
-        device_info = sd.query_devices(args.device, 'input')
-        args.samplerate = int(device_info['default_samplerate'])  # Convert to int
-
-    if args.filename is None:
-        args.filename = tempfile.mktemp(prefix='delme_rec_unlimited_', suffix='.wav', dir='')
-
-    print(f"🎤 Recording audio at {args.samplerate} Hz, saving to {args.filename}")
-
-    # Open file before recording
-    with sf.SoundFile(args.filename, mode='x', samplerate=args.samplerate,
-                      channels=args.channels, subtype=args.subtype) as file:
-        with sd.InputStream(samplerate=args.samplerate, device=args.device,
-                            channels=args.channels, callback=callback):
-            print('#' * 80)
-            print('🎙️ Press Ctrl+C to stop recording')
-            print('#' * 80)
-            while True:
-                file.write(q.get())
-
-except KeyboardInterrupt:
-    print(f'\n✅ Recording finished: {args.filename}')
-
-    # Apply noise reduction after recording
-    denoised_filename = args.filename.replace(".wav", "_denoised.wav")
-    print(f"🔄 Denoising file: {args.filename} -> {denoised_filename}")
-
-    # Load the recorded file
-    with sf.SoundFile(args.filename, 'r') as file:
-        audio_data = file.read(dtype=np.float32)  # Read as float32
-        samplerate = file.samplerate
-        channels = file.channels
-
-    # Ensure the audio is in the correct format
-    if channels == 1:
-        audio_data = np.expand_dims(audio_data, axis=1)  # Make it 2D (N, 1)
-
-    # Initialize RNNoise
-    denoiser = RNNoise(sample_rate=samplerate)
-
-    # Process frame by frame
-    denoised_audio = np.array([denoiser.process_frame(audio_data[:, ch], last=False) for ch in range(audio_data.shape[1])]).T
-
-    # Save the denoised file
-    with sf.SoundFile(denoised_filename, 'w', samplerate=samplerate,
-                      channels=channels, subtype='PCM_16') as file:
-        file.write(denoised_audio)
-
-    print(f"✅ Denoised audio saved as: {denoised_filename}")
-
-    parser.exit(0)
-
-except Exception as e:
-    parser.exit(type(e).__name__ + ': ' + str(e))
+# Worker for post-recording denoising (top-level so it can be pickled)
+def denoise_channel(ch_data, sr):
+    """Denoises one contiguous channel with its own RNNoise instance, one 10 ms frame at a time."""
+    denoiser = RNNoise(sample_rate=sr)
+    frame_size = int(sr) // 100  # One RNNoise frame at the recording rate
+
+    # Pad the trailing partial frame so every call sees a full frame
+    num_samples = len(ch_data)
+    padded_len = -(-num_samples // frame_size) * frame_size
+    if padded_len != num_samples:
+        ch_data = np.pad(ch_data, (0, padded_len - num_samples))
+
+    # Collect what RNNoise returns rather than assuming one output sample per input sample,
+    # and tell it which frame is the last so it flushes any buffered audio
+    denoised_frames = []
+    for start in range(0, padded_len, frame_size):
+        end = start + frame_size
+        denoised_frames.append(denoiser.process_frame(ch_data[start:end], last=end == padded_len))
+    if not denoised_frames:
+        return ch_data
+    return np.concatenate(denoised_frames)[:num_samples]
+
+# Worker processes re-import this script, so only the main process records
+if __name__ == '__main__':
+    # Importing sounddevice initializes PortAudio, so workers must not import it
+    import sounddevice as sd
+
+    # Argument parser setup
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        '-l', '--list-devices', action='store_true',
+        help='Show list of audio devices and exit'
+    )
+    args, remaining = parser.parse_known_args()
+    if args.list_devices:
+        print(sd.query_devices())
+        parser.exit(0)
+
+    parser = argparse.ArgumentParser(
+        description="Record audio and apply noise reduction using pyrnnoise",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        parents=[parser]
+    )
+    parser.add_argument('filename', nargs='?', metavar='FILENAME', help='Audio file to store recording')
+    parser.add_argument('-d', '--device', type=int_or_str, help='Input device (numeric ID or substring)')
+    parser.add_argument('-r', '--samplerate', type=int, help='Sampling rate')
+    parser.add_argument('-c', '--channels', type=int, default=1, help='Number of input channels')
+    parser.add_argument('-t', '--subtype', type=str, help='Sound file subtype (e.g. "PCM_24")')
+    args = parser.parse_args(remaining)
+
+    q = queue.Queue()
+
+    # Callback function for real-time audio streaming
+    def callback(indata, frames, time, status):
+        if status:
+            print(status, file=sys.stderr)
+        q.put(indata.copy())
+
+    try:
+        if args.samplerate is None:
+            device_info = sd.query_devices(args.device, 'input')
+            args.samplerate = int(device_info['default_samplerate'])  # Convert to int
+
+        if args.filename is None:
+            args.filename = tempfile.mktemp(prefix='delme_rec_unlimited_', suffix='.wav', dir='')
+
+        print(f"🎤 Recording audio at {args.samplerate} Hz, saving to {args.filename}")
+
+        # Reused for batched writes (1 second of audio)
+        write_buf = np.empty((args.samplerate, args.channels), dtype=np.float32)
+
+        # Open file before recording
+        with sf.SoundFile(args.filename, mode='x', samplerate=args.samplerate,
+                          channels=args.channels, subtype=args.subtype) as file:
+            with sd.InputStream(samplerate=args.samplerate, device=args.device,
+                                channels=args.channels, dtype='float32', callback=callback):
+                print('#' * 80)
+                print('🎙️ Press Ctrl+C to stop recording')
+                print('#' * 80)
+                while True:
+                    # Drain everything queued so far and write it in one call
+                    chunks = [q.get()]
+                    while not q.empty():
+                        chunks.append(q.get_nowait())
+                    total = sum(len(chunk) for chunk in chunks)
+                    if len(chunks) == 1:
+                        file.write(chunks[0])
+                    elif total <= len(write_buf):
+                        file.write(np.concatenate(chunks, axis=0, out=write_buf[:total]))
+                    else:
+                        file.write(np.concatenate(chunks, axis=0))
+
+    except KeyboardInterrupt:
+        print(f'\n✅ Recording finished: {args.filename}')
+
+        # Apply noise reduction after recording
+        denoised_filename = args.filename.replace(".wav", "_denoised.wav")
+        print(f"🔄 Denoising file: {args.filename} -> {denoised_filename}")
+
+        # Load the recorded file
+        with sf.SoundFile(args.filename, 'r') as file:
+            audio_data = file.read(dtype=np.float32)  # Read as float32
+            samplerate = file.samplerate
+            channels = file.channels
+
+        # Ensure the audio is in the correct format
+        if channels == 1:
+            audio_data = np.expand_dims(audio_data, axis=1)  # Make it 2D (N, 1)
+
+        # Lay each channel out contiguously instead of striding through interleaved samples
+        audio_soa = np.ascontiguousarray(audio_data.T)
+
+        # Denoise channels in parallel worker processes, stacking straight into (N, channels);
+        # mono gains nothing from a pool, so it stays in this process
+        if channels == 1:
+            results = [denoise_channel(audio_soa[0], samplerate)]
+        else:
+            with ProcessPoolExecutor(max_workers=min(channels, os.cpu_count() or 1)) as executor:
+                results = list(executor.map(denoise_channel, audio_soa, repeat(samplerate)))
+        denoised_audio = np.empty((len(results[0]), channels), dtype=np.float32)
+        np.stack(results, axis=1, out=denoised_audio)
+
+        # Save the denoised file
+        with sf.SoundFile(denoised_filename, 'w', samplerate=samplerate,
+                          channels=channels, subtype='PCM_16') as file:
+            file.write(denoised_audio)
+
+        print(f"✅ Denoised audio saved as: {denoised_filename}")
+
+        parser.exit(0)
+
+    except Exception as e:
+        parser.exit(type(e).__name__ + ': ' + str(e))